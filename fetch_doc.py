@@ -2,9 +2,12 @@
 This script fetches the bill text from Congress.gov using alternative methods.
 '''
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import lxml.etree
+import lxml.html
 import os
-import time
+import asyncio
 from urllib.parse import urljoin
 
 # Working URLs for bill text
@@ -17,96 +20,200 @@ URLS = [
 OUTPUT_DIR = "books"
 FILE_NAME = "one_big_beautiful_bill.txt"
 OUTPUT_PATH = os.path.join(OUTPUT_DIR, FILE_NAME)
+# ETag of the page the saved text came from, used for conditional GETs
+ETAG_PATH = OUTPUT_PATH + ".etag"
+# A saved file at least this large is reused as-is unless FORCE_REFETCH is set
+MIN_CACHED_SIZE = 1000
+
+# Comprehensive headers to make the request appear more like a browser
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Sec-Fetch-User': '?1',
+    'Cache-Control': 'max-age=0'
+}
+
+# (connect, read) timeouts in seconds
+REQUEST_TIMEOUT = (5, 30)
+
+# Size of each block read from the response stream
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Buffer size used when writing the extracted text to disk
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Retry transient failures (connection errors, timeouts, 429 and 5xx responses)
+# on the same URL with exponential backoff, honoring any Retry-After header
+RETRY_POLICY = Retry(
+    total=5,
+    backoff_factor=0.5,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=["GET"]
+)
+
+# A single pooled session shared by all fetches, so every URL on congress.gov
+# reuses the same keep-alive connection instead of paying a new TLS handshake
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=RETRY_POLICY))
+
+def has_class(name):
+    '''Returns an XPath condition matching elements that carry the given CSS class.'''
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+# Elements that might contain the bill text, in priority order, as
+# (CSS selector, equivalent XPath condition) pairs
+SELECTORS = [
+    ('.bill-text-container', has_class('bill-text-container')),
+    ('.generated-html-container', has_class('generated-html-container')),
+    ('.main-content', has_class('main-content')),
+    ('#main-content', "@id='main-content'"),
+    ('.bill-text', has_class('bill-text')),
+    ('main', "self::main")
+]
+
+# Compiled once at import: a single query that finds every candidate container,
+# plus one predicate per selector used to rank the candidates it returns
+FIND_CANDIDATES = lxml.etree.XPath("//*[" + " or ".join(f"({condition})" for _, condition in SELECTORS) + "]")
+SELECTOR_MATCHERS = [(selector, lxml.etree.XPath(f"boolean({condition})")) for selector, condition in SELECTORS]
+
+def extract_text(element):
+    '''Joins the stripped, non-empty text fragments of an element with newlines.'''
+    return '\n'.join(text.strip() for text in element.itertext() if text.strip())
+
+def fetch_one(url, etag=None):
+    '''Downloads a single URL and extracts the bill text from its HTML.
+
+    Returns a (bill_text, etag) tuple. bill_text is None when the server answers
+    304 Not Modified to the If-None-Match header built from the given etag.
+    '''
+    headers = {'If-None-Match': etag} if etag else None
+
+    with SESSION.get(url, headers=headers, timeout=REQUEST_TIMEOUT, stream=True) as response:
+        if response.status_code == 304:
+            print(f"Content not modified at {url}")
+            return None, etag
+        response.raise_for_status()  # Raise an exception for HTTP errors
+        etag = response.headers.get('ETag')
+
+        # Stream the body into lxml's incremental parser so the raw HTML is never
+        # held in memory as a whole and parsing overlaps with the download.
+        # Decode with the charset the server declares; without one, lxml falls
+        # back to the page's <meta charset>. (requests reports ISO-8859-1 for any
+        # text/* response lacking a charset, so only an explicit one is trusted.)
+        declares_charset = 'charset=' in response.headers.get('Content-Type', '').lower()
+        parser = lxml.html.HTMLParser(encoding=response.encoding if declares_charset else None)
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            parser.feed(chunk)
+    tree = parser.close()
+    print(f"Content fetched successfully from {url}")
+
+    # Drop non-text elements
+    lxml.etree.strip_elements(tree, 'script', 'style', with_tail=False)
+
+    # Try to extract the bill text content
+    # Look for the main content area that typically contains bill text
+    bill_text = None
+
+    # Find every candidate container in one tree traversal, then pick the
+    # highest-priority selector that matched
+    candidates = FIND_CANDIDATES(tree)
+    for selector, matches in SELECTOR_MATCHERS:
+        content = next((el for el in candidates if matches(el)), None)
+        if content is not None:
+            bill_text = extract_text(content)
+            print(f"Found content in {url} using selector: {selector}")
+            break
+
+    # If no specific selector worked, try getting all text from body
+    if not bill_text:
+        body = tree.find('body')
+        bill_text = extract_text(body if body is not None else tree)
+        print(f"Using general body text extraction for {url}")
+
+    return bill_text, etag
+
+async def fetch_all(urls, etag=None):
+    '''Fetches all URLs concurrently over the shared session, returning results in input order.'''
+    tasks = [asyncio.to_thread(fetch_one, url, etag) for url in urls]
+    return await asyncio.gather(*tasks, return_exceptions=True)
 
 def fetch_doc():
     '''Fetches the bill text from Congress.gov and saves it as plain text.'''
     try:
         # Create the output directory if it doesn't exist
-        if not os.path.exists(OUTPUT_DIR):
-            os.makedirs(OUTPUT_DIR)
-            print(f"Created directory: {OUTPUT_DIR}")
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+        # Reuse the saved text without touching the network unless asked to check or refetch
+        has_cached_text = os.path.exists(OUTPUT_PATH) and os.path.getsize(OUTPUT_PATH) > MIN_CACHED_SIZE
+        force_refetch = bool(os.environ.get("FORCE_REFETCH"))
+        revalidate = bool(os.environ.get("REVALIDATE"))
+        if has_cached_text and not force_refetch and not revalidate:
+            print(f"Using cached bill text at {OUTPUT_PATH} "
+                  "(set REVALIDATE=1 to check for a newer version, or FORCE_REFETCH=1 to fetch again).")
+            return
 
-        # Try each working URL
+        # When only revalidating usable saved text, let the server answer 304 instead of
+        # re-sending it; a forced refetch or a too-small file is always downloaded again
+        etag = None
+        if has_cached_text and not force_refetch and os.path.exists(ETAG_PATH):
+            with open(ETAG_PATH, "r", encoding="utf-8") as f:
+                etag = f.read().strip() or None
+
+        # Fetch every working URL in parallel
         for i, url in enumerate(URLS):
             print(f"Fetching from URL {i+1}: {url}...")
-            
-            try:
-                # Create a session to maintain cookies and connection state
-                session = requests.Session()
-                
-                # Add comprehensive headers to make the request appear more like a browser
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-                    'Accept-Language': 'en-US,en;q=0.9',
-                    'Accept-Encoding': 'gzip, deflate, br',
-                    'DNT': '1',
-                    'Connection': 'keep-alive',
-                    'Upgrade-Insecure-Requests': '1',
-                    'Sec-Fetch-Dest': 'document',
-                    'Sec-Fetch-Mode': 'navigate',
-                    'Sec-Fetch-Site': 'none',
-                    'Sec-Fetch-User': '?1',
-                    'Cache-Control': 'max-age=0'
-                }
-                
-                session.headers.update(headers)
-                
-                # Add a small delay to be respectful
-                time.sleep(2)
-                
-                response = session.get(url, timeout=30)
-                response.raise_for_status()  # Raise an exception for HTTP errors
-                print(f"Content fetched successfully from {url}")
-                
-                # Parse the HTML using BeautifulSoup
-                print("Parsing HTML content...")
-                soup = BeautifulSoup(response.content, 'html.parser')
-                print("HTML parsed successfully.")
-                
-                # Try to extract the bill text content
-                # Look for the main content area that typically contains bill text
-                bill_text = None
-                
-                # Try different selectors that might contain the bill text
-                selectors = [
-                    '.bill-text-container',
-                    '.generated-html-container', 
-                    '.main-content',
-                    '#main-content',
-                    '.bill-text',
-                    'main'
-                ]
-                
-                for selector in selectors:
-                    content = soup.select_one(selector)
-                    if content:
-                        bill_text = content.get_text(separator='\n', strip=True)
-                        print(f"Found content using selector: {selector}")
-                        break
-                
-                # If no specific selector worked, try getting all text from body
-                if not bill_text:
-                    bill_text = soup.body.get_text(separator='\n', strip=True) if soup.body else soup.get_text(separator='\n', strip=True)
-                    print("Using general body text extraction")
-                
-                # Write the extracted text to the output file
-                if bill_text and len(bill_text.strip()) > 100:  # Make sure we got substantial content
-                    print(f"Saving text to {OUTPUT_PATH}...")
-                    with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
-                        f.write(f"Fetched from: {url}\n")
-                        f.write("="*50 + "\n\n")
-                        f.write(bill_text)
-                    print(f"Successfully saved bill text to {OUTPUT_PATH}")
-                    print(f"Content length: {len(bill_text)} characters")
-                    return  # Success, exit the function
-                else:
-                    print(f"Content too short or empty from {url}, trying next URL...")
-                    
-            except requests.exceptions.RequestException as e:
-                print(f"Error fetching from {url}: {e}")
+        results = asyncio.run(fetch_all(URLS, etag))
+
+        # Keep the first URL (in priority order) that produced substantial content
+        for url, result in zip(URLS, results):
+            if isinstance(result, requests.exceptions.RequestException):
+                print(f"Error fetching from {url}: {result}")
                 continue
-                
+            if isinstance(result, (lxml.etree.ParserError, lxml.etree.XMLSyntaxError)):
+                # An empty or unparseable body has no text to offer
+                print(f"Could not parse the content from {url}: {result}. Trying next URL...")
+                continue
+            if isinstance(result, Exception):
+                raise result
+
+            bill_text, etag = result
+            if bill_text is None:
+                print(f"{OUTPUT_PATH} is already up to date.")
+                return
+
+            # Write the extracted text to the output file
+            if bill_text and len(bill_text.strip()) > 100:  # Make sure we got substantial content
+                print(f"Saving text to {OUTPUT_PATH}...")
+                # Encode once and write the bytes to a temporary file, then swap it
+                # in atomically so an interrupted run never leaves a truncated file
+                header = f"Fetched from: {url}\n" + "="*50 + "\n\n"
+                tmp_path = OUTPUT_PATH + ".tmp"
+                with open(tmp_path, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+                    f.write(header.encode("utf-8"))
+                    f.write(bill_text.encode("utf-8"))
+                os.replace(tmp_path, OUTPUT_PATH)
+
+                # Remember the validator for the next run, or forget a stale one
+                if etag:
+                    with open(ETAG_PATH, "w", encoding="utf-8") as f:
+                        f.write(etag)
+                elif os.path.exists(ETAG_PATH):
+                    os.remove(ETAG_PATH)
+                print(f"Successfully saved bill text to {OUTPUT_PATH}")
+                print(f"Content length: {len(bill_text)} characters")
+                return  # Success, exit the function
+            else:
+                print(f"Content too short or empty from {url}, trying next URL...")
+
         # If we get here, all working URLs failed
         print("All working URLs failed. Please check:")
         print("1. Your internet connection")
@@ -0,0 +1,48 @@
+'''
+This script answers the chatbot's sample questions once, ahead of deployment, and saves
+the answers to sample_answers.json so the chatbot can show them without calling OpenAI.
+Re-run it whenever the bill text, the prompt or the sample questions change.
+'''
+import os
+import json
+import rag_chatbot
+
+def precompute_sample_answers():
+    '''Generates an answer to every sample question and merges them into the {question: answer} table.'''
+    if not rag_chatbot.initialize_chatbot():
+        print("Could not initialize the chatbot; no answers were generated.")
+        return
+
+    answers = {}
+    for question, embedding in zip(rag_chatbot.sample_questions, rag_chatbot.SAMPLE_Q_EMBEDDINGS):
+        print(f"Answering: {question}")
+        try:
+            answer = rag_chatbot.answer_question(question, embedding)
+        except Exception as e:
+            print(f"Error while answering: {e}. Any previously saved answer is kept.")
+            continue
+        if not answer:
+            print("No answer was generated. Any previously saved answer is kept.")
+            continue
+        answers[question] = answer
+
+    if not answers:
+        print(f"No answers were generated; {rag_chatbot.SAMPLE_ANSWERS_PATH} was left unchanged.")
+        return
+
+    # Merge into the saved table so a partly failed run doesn't lose good answers,
+    # dropping those to questions that are no longer samples
+    table = {question: answer for question, answer in rag_chatbot.load_sample_answers().items()
+             if question in rag_chatbot.sample_questions}
+    table.update(answers)
+
+    # Write to a temporary file, then swap it in so an interrupted run never leaves a truncated table
+    tmp_path = rag_chatbot.SAMPLE_ANSWERS_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(table, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, rag_chatbot.SAMPLE_ANSWERS_PATH)
+    print(f"Saved {len(answers)} new answers to {rag_chatbot.SAMPLE_ANSWERS_PATH} "
+          f"({len(table)} of {len(rag_chatbot.sample_questions)} sample questions answered).")
+
+if __name__ == "__main__":
+    precompute_sample_answers()
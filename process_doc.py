@@ -3,22 +3,106 @@ This script loads the plain text of the One Big Beautiful Bill, splits it into c
 creates embeddings using OpenAI, and stores them in a Chroma vectorstore.
 '''
 import os
+import uuid
+import asyncio
+import chromadb
+import numpy as np
+import tiktoken
 from dotenv import load_dotenv
 from langchain_community.document_loaders import TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
 from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
+from langchain_classic.embeddings import CacheBackedEmbeddings
+from langchain_classic.storage import LocalFileStore
 
 load_dotenv() # Load environment variables from .env file
 
 # Configuration
 SOURCE_TEXT_PATH = os.path.join("books", "one_big_beautiful_bill.txt")
 CHROMA_DB_PATH = "chroma_db_bill_text"
+COLLECTION_NAME = "langchain" # Collection the chatbot loads
+STAGING_COLLECTION_NAME = f"{COLLECTION_NAME}_build" # Built in full before it replaces COLLECTION_NAME
+EMBEDDING_MODEL = "text-embedding-ada-002" # The chatbot embeds questions with the same model
+EMBEDDING_CACHE_PATH = "emb_cache" # On-disk cache of embeddings, keyed by a hash of the embedded text
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY") # Ensure your OPENAI_API_KEY is set as an environment variable
 
-# Chunking parameters (can be adjusted)
-CHUNK_SIZE = 1000
-CHUNK_OVERLAP = 200
+# Chunking parameters, in tokens of the embedding model's encoding (can be adjusted)
+ENCODING_NAME = "cl100k_base"
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 150
+
+# Embedding parameters (can be adjusted)
+EMBED_BATCH_SIZE = 500 # Texts sent in each embedding request
+EMBED_CONCURRENCY = 8 # Embedding requests in flight at once
+
+# HNSW index settings, fixed when the collection is created. Cosine suits OpenAI
+# embeddings; the larger graph and build-time ef make every later query faster.
+HNSW_METADATA = {
+    "hnsw:space": "cosine",
+    "hnsw:M": 32,
+    "hnsw:construction_ef": 200,
+    "hnsw:search_ef": 64
+}
+
+def split_into_token_chunks(documents):
+    '''Splits documents into windows of CHUNK_SIZE tokens overlapping by CHUNK_OVERLAP tokens.
+
+    Each document is tokenized once; chunks are then cut by slicing the token array.
+    '''
+    encoding = tiktoken.get_encoding(ENCODING_NAME)
+    stride = CHUNK_SIZE - CHUNK_OVERLAP
+    chunks = []
+    for document in documents:
+        ids = np.array(encoding.encode_ordinary(document.page_content), dtype=np.int32)
+        if len(ids) == 0:
+            continue
+        # Stop once the remaining tokens are already covered by the previous window's overlap
+        for start in range(0, max(len(ids) - CHUNK_OVERLAP, 1), stride):
+            text = encoding.decode(ids[start:start + CHUNK_SIZE].tolist())
+            chunks.append(Document(page_content=text, metadata=dict(document.metadata)))
+    return chunks
+
+async def embed_and_store(embeddings, collection, chunks):
+    '''Embeds chunks in concurrent batches and writes each batch to the collection as soon as it is ready.
+
+    Embedding requests (network-bound) and Chroma inserts (disk-bound) overlap
+    through a bounded queue. Returns the number of chunks stored.
+    '''
+    queue = asyncio.Queue(maxsize=EMBED_CONCURRENCY * 2)
+    semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
+    batches = [chunks[i:i + EMBED_BATCH_SIZE] for i in range(0, len(chunks), EMBED_BATCH_SIZE)]
+
+    async def embedder(batch):
+        async with semaphore:
+            vectors = await embeddings.aembed_documents([chunk.page_content for chunk in batch])
+        # Store unit-length vectors so cosine distance reduces to a single dot product
+        vectors = np.asarray(vectors, dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        await queue.put((batch, vectors))
+
+    async def produce():
+        await asyncio.gather(*[embedder(batch) for batch in batches])
+        await queue.put(None) # Tell the writer no more batches are coming
+
+    async def writer():
+        stored = 0
+        while True:
+            item = await queue.get()
+            if item is None:
+                return stored
+            batch, vectors = item
+            # add() blocks, so run it off the event loop to keep the embedders going
+            await asyncio.to_thread(
+                collection.add,
+                ids=[str(uuid.uuid4()) for _ in batch],
+                embeddings=vectors,
+                documents=[chunk.page_content for chunk in batch],
+                metadatas=[chunk.metadata for chunk in batch]
+            )
+            stored += len(batch)
+
+    _, stored = await asyncio.gather(produce(), writer())
+    return stored
 
 def process_and_store_text():
     '''Loads text, splits it, creates embeddings, and stores them in Chroma.'''
@@ -42,13 +126,8 @@ def process_and_store_text():
         print(f"Loaded {len(documents)} document(s).")
 
         # 2. Split the text into chunks
-        print(f"Splitting text into chunks (size: {CHUNK_SIZE}, overlap: {CHUNK_OVERLAP})...")
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=CHUNK_SIZE,
-            chunk_overlap=CHUNK_OVERLAP,
-            length_function=len
-        )
-        chunks = text_splitter.split_documents(documents)
+        print(f"Splitting text into chunks (size: {CHUNK_SIZE} tokens, overlap: {CHUNK_OVERLAP} tokens)...")
+        chunks = split_into_token_chunks(documents)
         print(f"Split into {len(chunks)} chunks.")
 
         if not chunks:
@@ -57,19 +136,49 @@ def process_and_store_text():
 
         # 3. Create OpenAI embeddings
         print("Initializing OpenAI embeddings model...")
-        embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+        openai_embeddings = OpenAIEmbeddings(
+            model=EMBEDDING_MODEL,
+            openai_api_key=OPENAI_API_KEY,
+            chunk_size=EMBED_BATCH_SIZE,
+            max_retries=5
+        )
+        # Only chunks that have never been embedded with this model reach the API
+        embeddings = CacheBackedEmbeddings.from_bytes_store(
+            openai_embeddings,
+            LocalFileStore(EMBEDDING_CACHE_PATH),
+            namespace=openai_embeddings.model
+        )
         print("OpenAI embeddings model initialized.")
 
-        # 4. Create and persist the Chroma vectorstore
-        print(f"Creating/loading Chroma vectorstore at {CHROMA_DB_PATH}...")
-        # If the directory already exists, Chroma will try to load it.
-        # If you want to ensure a fresh store, you might want to delete the CHROMA_DB_PATH directory first.
-        vectorstore = Chroma.from_documents(
-            documents=chunks,
-            embedding=embeddings,
-            persist_directory=CHROMA_DB_PATH
-        )
-        print(f"Vectorstore created/updated and persisted at {CHROMA_DB_PATH}.")
+        # 4. Create a staging Chroma collection; the live one stays untouched until the new one is complete
+        print(f"Creating Chroma vectorstore at {CHROMA_DB_PATH}...")
+        client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
+        # HNSW settings only apply to a new collection, so build it from scratch;
+        # with the embedding cache this re-uses every previously computed vector
+        try:
+            client.delete_collection(STAGING_COLLECTION_NAME)
+        except Exception:
+            pass # No leftover from an interrupted run
+        collection = client.create_collection(STAGING_COLLECTION_NAME, metadata=HNSW_METADATA)
+
+        # 5. Embed the chunks, storing each batch while later batches are still being embedded
+        print(f"Embedding and storing {len(chunks)} chunks (batch size: {EMBED_BATCH_SIZE}, concurrency: {EMBED_CONCURRENCY})...")
+        try:
+            stored = asyncio.run(embed_and_store(embeddings, collection, chunks))
+            if stored != len(chunks):
+                raise RuntimeError(f"only {stored} of {len(chunks)} chunks were stored")
+        except Exception:
+            client.delete_collection(STAGING_COLLECTION_NAME) # Keep the previous collection in service
+            raise
+        print(f"Stored {stored} embeddings.")
+
+        # 6. Swap the complete collection in for the previous one
+        try:
+            client.delete_collection(COLLECTION_NAME)
+        except Exception:
+            pass # Nothing to replace on the first run
+        collection.modify(name=COLLECTION_NAME)
+        print(f"Vectorstore created and persisted at {CHROMA_DB_PATH}.")
         print("Processing complete.")
 
     except Exception as e:
@@ -3,14 +3,15 @@ This script creates a Gradio chatbot UI to interact with the One Big Beautiful B
 using gpt-4o-mini as the LLM and the Chroma DB as a RAG context.
 '''
 import os
-import gradio as gr
-from functools import partial
+import json
 import time
+import asyncio
 import threading
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain.chains import RetrievalQA
-from langchain.prompts import PromptTemplate
+from collections import OrderedDict
+import numpy as np
+import openai
+import chromadb
+import gradio as gr
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -18,15 +19,236 @@ load_dotenv()
 
 # Configuration
 CHROMA_DB_PATH = "chroma_db_bill_text"
+COLLECTION_NAME = "langchain" # Collection written by process_doc.py
+EMBEDDING_MODEL = "text-embedding-ada-002" # Must match the model process_doc.py embedded the bill with
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY") # Ensure your OPENAI_API_KEY is set
 LLM_MODEL = "gpt-4o-mini"
+LLM_TEMPERATURE = 0.0 # Factual explanations; identical prompts get (near-)identical answers
+LLM_SEED = 42 # Fixed sampling seed for reproducible answers
+LLM_MAX_TOKENS = 800 # Caps the length, and so the decode time, of each answer
+LLM_TIMEOUT = 30 # Seconds before an OpenAI request is abandoned
+LLM_MAX_RETRIES = 2
+RETRIEVER_K = 4 # Number of bill chunks stuffed into the prompt
+RETRIEVER_FETCH_K = 20 # Candidates MMR picks the diverse top chunks from
+RETRIEVER_LAMBDA_MULT = 0.5 # MMR trade-off: 1 favors relevance only, 0 favors diversity only
+
+# Prompt. The instructions form a static system message that precedes all
+# per-request content, so OpenAI can reuse its cached prefix.
+SYSTEM_PROMPT = """\
+You are an experienced lawyer specializing in legislative analysis who has thoroughly studied the bill. Help people understand it in clear, everyday language.
+
+Rules:
+1. Accuracy is paramount: the bill will soon become law, so use only the provided context and never invent or misrepresent anything.
+2. Explain legal language in layman's terms, using examples or analogies when they help.
+3. Start with a direct answer, then explain the practical, real-world effects of the provisions involved.
+4. If the context doesn't fully answer the question, say so, share the related information it does contain, and suggest more specific questions to ask.
+5. Be fair and balanced, without political bias.
+6. Refer to the legislation only as "the bill", never by bill number or formal title.
+"""
+USER_PROMPT = """\
+Context from the bill: {context}
+
+Question: {question}
+"""
+
+# Chat completion parameters shared by streamed answers and the cache pre-warm
+COMPLETION_PARAMS = {
+    "model": LLM_MODEL,
+    "temperature": LLM_TEMPERATURE,
+    "seed": LLM_SEED,
+    "max_tokens": LLM_MAX_TOKENS
+}
+
+# Answers to the sample questions, generated ahead of time by precompute_samples.py
+SAMPLE_ANSWERS_PATH = "sample_answers.json"
+
+# Stylesheet for the Gradio interface
+CSS_PATH = os.path.join("static", "chat.css")
+
+# Gradio queue settings
+CONCURRENCY_LIMIT = 8 # Requests answered at once; keep within the OpenAI rate limit
+MAX_QUEUE_SIZE = 64 # Requests allowed to wait before new ones are turned away
+
+# Response cache settings
+RESPONSE_CACHE_CAPACITY = 1000 # Answers kept before the least recently used is evicted
+RESPONSE_CACHE_TTL = 3600 # Seconds an answer stays valid
+SEMANTIC_CACHE_THRESHOLD = 0.95 # Cosine similarity for a differently worded question to count as a hit
+
+# Retrieval cache settings
+RETRIEVAL_CACHE_SIZE = 2048 # Retrieved chunk lists kept before the least recently used is evicted
+RETRIEVAL_CACHE_TTL = 86400 # Seconds retrieved chunks stay valid; the indexed bill doesn't change while the app runs
+# MMR picks chunks specifically for each query, so only questions close enough to share
+# an answer may share them too; the cache mainly serves questions whose answers expired
+RETRIEVAL_CACHE_THRESHOLD = SEMANTIC_CACHE_THRESHOLD
+EMBEDDING_CACHE_SIZE = 2048 # Question embeddings kept, keyed by question text (~6 KB each as float32)
+
+def unit_vector(vector):
+    '''Returns the vector as float32 scaled to unit length, so dot products are cosine similarities.'''
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+def mmr(query, candidates, k, lambda_mult):
+    '''Returns the indices of k candidate vectors picked by maximal marginal relevance.
+
+    Similarities to the query and between all candidates are computed once up front;
+    each pick then only updates every candidate's similarity to the picked set.
+    '''
+    if len(candidates) == 0:
+        return []
+    candidates = candidates / np.linalg.norm(candidates, axis=1, keepdims=True)
+    relevance = candidates @ unit_vector(query)
+    pairwise = candidates @ candidates.T
+
+    selected = [int(np.argmax(relevance))]
+    available = np.ones(len(candidates), dtype=bool)
+    available[selected[0]] = False
+    redundancy = pairwise[selected[0]].copy() # Highest similarity of each candidate to the picked set
+    while len(selected) < min(k, len(candidates)):
+        scores = np.where(available, lambda_mult * relevance - (1 - lambda_mult) * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, pairwise[best])
+    return selected
+
+class LRUCache:
+    '''Thread-safe mapping that evicts its least recently used entry once it holds more than maxsize.'''
 
-# Global variable for the RAG chain
-rag_chain = None
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        '''Returns the value stored under key, or None, marking it as recently used.'''
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        '''Stores value under key, evicting the least recently used entry if over capacity.'''
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+class SemanticCache:
+    '''LRU cache of per-question values with a time-to-live, matched by exact question or by embedding similarity.'''
+
+    def __init__(self, capacity, ttl, threshold):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.threshold = threshold
+        self._entries = OrderedDict() # normalized question -> (unit embedding, value, expiry time)
+        self._keys = [] # Row order of _matrix
+        self._matrix = None # Stacked entry embeddings, rebuilt lazily after the entries change
+        self._lock = threading.Lock() # Gradio runs handlers on multiple threads
+
+    @staticmethod
+    def normalize(question):
+        '''Returns the exact-match key for a question, ignoring case and extra whitespace.'''
+        return " ".join(question.lower().split())
+
+    def get(self, question, embedding=None):
+        '''Returns the cached value for a question, or None.
+
+        The normalized question is matched exactly first; if that misses and an
+        embedding is given, the most similar cached question above the threshold is used.
+        '''
+        key = self.normalize(question)
+        with self._lock:
+            if key not in self._entries and embedding is not None:
+                key = self._most_similar(embedding)
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= time.monotonic():
+                del self._entries[key]
+                self._matrix = None
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, question, embedding, value):
+        '''Caches the value for a question along with the question's embedding.'''
+        key = self.normalize(question)
+        with self._lock:
+            self._entries[key] = (unit_vector(embedding), value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def _most_similar(self, embedding):
+        '''Returns the key of the cached question most similar to the embedding, if above the threshold.'''
+        if not self._entries:
+            return None
+        if self._matrix is None:
+            self._keys = list(self._entries)
+            self._matrix = np.stack([self._entries[key][0] for key in self._keys])
+        similarities = self._matrix @ unit_vector(embedding)
+        best = int(np.argmax(similarities))
+        return self._keys[best] if similarities[best] >= self.threshold else None
+
+# Sample questions for easy access
+sample_questions = [
+    "Can you give me an overview of what the bill accomplishes?",
+    "What are the main tax changes in this bill and how will they affect ordinary taxpayers?",
+    "How does this bill change healthcare policy and what does it mean for patients?",
+    "What education funding changes does this bill make and who benefits?",
+    "How does this bill address infrastructure and what projects does it fund?",
+    "What are the defense and national security provisions in this legislation?",
+    "How does this bill reform immigration law and what are the key changes?",
+    "What environmental and climate provisions are included in this bill?",
+    "How does this bill affect Social Security and Medicare?",
+    "What are the small business provisions and how do they help entrepreneurs?"
+]
+
+def load_sample_answers():
+    '''Returns the precomputed {question: answer} table, or an empty one if it hasn't been generated.'''
+    try:
+        with open(SAMPLE_ANSWERS_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+# Sample questions answered straight from the table, without embedding, retrieval or the LLM
+SAMPLE_ANSWERS = load_sample_answers()
+
+# Global variables for the OpenAI clients and the Chroma collection
+openai_client = None # Blocking client, for startup and the cache pre-warm thread
+async_openai_client = None # Client for request handlers on Gradio's event loop
+collection = None
+
+# Unit-length embeddings of sample_questions (one row each), computed in a single request at startup
+SAMPLE_Q_EMBEDDINGS = None
+
+# Answers to previously asked questions
+response_cache = SemanticCache(RESPONSE_CACHE_CAPACITY, RESPONSE_CACHE_TTL, SEMANTIC_CACHE_THRESHOLD)
+
+# Chunks retrieved for previous questions, so a closely related question skips the vector search
+retrieval_cache = SemanticCache(RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_TTL, RETRIEVAL_CACHE_THRESHOLD)
+
+# Embeddings of previous questions, so a repeated question is embedded only once
+embedding_cache = LRUCache(EMBEDDING_CACHE_SIZE)
+
+def format_docs(docs):
+    '''Joins the retrieved bill chunks into the context block of the prompt.'''
+    return "\n\n".join(docs)
+
+def build_messages(question, docs):
+    '''Returns the chat messages asking the LLM to answer the question from the retrieved chunks.'''
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": USER_PROMPT.format(context=format_docs(docs), question=question)}
+    ]
 
 def initialize_chatbot():
-    '''Initializes the RAG chain for the chatbot.'''
-    global rag_chain
+    '''Initializes the OpenAI clients and the Chroma collection for the chatbot.'''
+    global openai_client, async_openai_client, collection, SAMPLE_Q_EMBEDDINGS
     if not OPENAI_API_KEY:
         print("Error: OPENAI_API_KEY environment variable not set.")
         return False
@@ -37,322 +259,268 @@ def initialize_chatbot():
         return False
 
     try:
-        print("Initializing OpenAI Embeddings and LLM...")
-        embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-        llm = ChatOpenAI(temperature=0.7, model_name=LLM_MODEL, openai_api_key=OPENAI_API_KEY)
-
-        print(f"Loading Chroma vectorstore from {CHROMA_DB_PATH}...")
-        vectorstore = Chroma(persist_directory=CHROMA_DB_PATH, embedding_function=embeddings)
-        print("Vectorstore loaded successfully.")
-
-        # Create a retriever
-        retriever = vectorstore.as_retriever()
-
-        # Define a prompt template
-        prompt_template = """
-        You are a knowledgeable and experienced lawyer who specializes in legislative analysis and has thoroughly studied the bill. Your role is to help people understand this important legislation by explaining it in clear, accessible language that anyone can understand.
-
-        Key instructions for your responses:
-        1. ACCURACY IS PARAMOUNT: This bill will soon become law, so never misrepresent or make up information. Only use what's provided in the context.
-        2. EXPLAIN IN LAYMAN'S TERMS: Break down complex legal language into simple, everyday terms that non-lawyers can understand.
-        3. BE HELPFUL AND THOROUGH: Instead of simply saying "I don't know," try to:
-           - Examine related sections that might be relevant
-           - Suggest more specific questions the user could ask
-           - Provide context about what the bill does cover, even if their exact question isn't answered
-        4. SUMMARIZE EFFECTIVELY: Help users understand the practical implications and real-world effects of different provisions.
-        5. BE FAIR AND BALANCED: Present information objectively without political bias.
-        6. REFER TO THE LEGISLATION: Always refer to the legislation simply as the bill in your responses, not by any specific bill number or formal title.
-
-        When answering:
-        - Start with a clear, direct answer when possible
-        - Explain what the provision means in practical terms
-        - If the context doesn't fully answer the question, acknowledge this but provide what relevant information you can
-        - Suggest related questions or areas they might want to explore
-        - Use examples or analogies when helpful for understanding
-
-        Context from the bill: {context}
-
-        Question: {question}
-
-        Answer:
-        """
-        PROMPT = PromptTemplate(
-            template=prompt_template, input_variables=["context", "question"]
-        )
+        print("Initializing OpenAI clients...")
+        client_options = {"api_key": OPENAI_API_KEY, "timeout": LLM_TIMEOUT, "max_retries": LLM_MAX_RETRIES}
+        openai_client = openai.OpenAI(**client_options)
+        async_openai_client = openai.AsyncOpenAI(**client_options)
 
-        chain_type_kwargs = {"prompt": PROMPT}
-        rag_chain = RetrievalQA.from_chain_type(
-            llm=llm,
-            chain_type="stuff",
-            retriever=retriever,
-            chain_type_kwargs=chain_type_kwargs,
-            return_source_documents=True
-        )
-        print("RAG chain initialized successfully.")
+        # Embed all sample questions in one batched request
+        response = openai_client.embeddings.create(model=EMBEDDING_MODEL, input=sample_questions)
+        SAMPLE_Q_EMBEDDINGS = np.array([item.embedding for item in response.data], dtype=np.float32)
+        SAMPLE_Q_EMBEDDINGS /= np.linalg.norm(SAMPLE_Q_EMBEDDINGS, axis=1, keepdims=True)
+        for question, embedding in zip(sample_questions, SAMPLE_Q_EMBEDDINGS):
+            embedding_cache.put(question, embedding)
+
+        print(f"Loading Chroma collection from {CHROMA_DB_PATH}...")
+        collection = chromadb.PersistentClient(path=CHROMA_DB_PATH).get_collection(COLLECTION_NAME)
+        print("Collection loaded successfully.")
+
+        # Run one query now so the index is loaded before the first user question
+        collection.query(query_embeddings=SAMPLE_Q_EMBEDDINGS[:1], n_results=1)
+        print("Collection warmed up.")
         return True
     except Exception as e:
         print(f"Error during chatbot initialization: {e}")
-        rag_chain = None # Ensure chain is None if initialization fails
+        openai_client = async_openai_client = collection = None # Ensure nothing half-initialized is used
         return False
 
-def chat_with_bill(question, history):
-    '''Handles the chat interaction with the RAG chain for bill analysis.'''
-    if rag_chain is None:
-        # Try to initialize again if not already done, or if it failed previously
-        if not initialize_chatbot():
-            return "Analysis system is not available. Please check the console for errors (e.g., missing API key or vector database)."
+async def embed_query(question):
+    '''Returns the embedding of a question, calling OpenAI only the first time it is seen.'''
+    embedding = embedding_cache.get(question)
+    if embedding is None:
+        response = await async_openai_client.embeddings.create(model=EMBEDDING_MODEL, input=[question])
+        embedding = np.array(response.data[0].embedding, dtype=np.float32)
+        embedding_cache.put(question, embedding)
+    return embedding
+
+def retrieve(query_embedding):
+    '''Returns the bill chunks for a query: MMR picks RETRIEVER_K of the RETRIEVER_FETCH_K nearest ones.'''
+    # Only what MMR and the prompt use; metadata isn't shown, so it isn't loaded
+    result = collection.query(
+        query_embeddings=[query_embedding],
+        n_results=RETRIEVER_FETCH_K,
+        include=["documents", "embeddings"]
+    )
+    documents = result["documents"][0]
+    candidates = np.asarray(result["embeddings"][0], dtype=np.float32)
+    return [documents[i] for i in mmr(query_embedding, candidates, RETRIEVER_K, RETRIEVER_LAMBDA_MULT)]
+
+async def generate_answer(question, docs):
+    '''Yields the LLM's answer token by token, using the retrieved docs as context.'''
+    stream = await async_openai_client.chat.completions.create(
+        messages=build_messages(question, docs),
+        stream=True,
+        **COMPLETION_PARAMS
+    )
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+async def chat_with_bill(question, history):
+    '''Handles the chat interaction with the RAG pipeline for bill analysis.
+
+    Yields the answer progressively as the LLM streams it.
+    '''
+    # The UI only accepts questions when initialization succeeded at startup
+    assert collection is not None, "RAG pipeline not initialized"
 
     print(f"Received question: {question}")
+    if (answer := response_cache.get(question)) is not None:
+        print("Serving answer from cache.")
+        yield answer
+        return
+
     try:
-        response = rag_chain.invoke({"query": question})
-        answer = response.get("result", "Sorry, I could not find an answer.")
-        # source_documents = response.get("source_documents", [])
-        # if source_documents:
-        #     answer += "\n\nSources:"
-        #     for doc in source_documents:
-        #         answer += f"\n- {doc.metadata.get('source', 'Unknown source')} (Page content snippet: {doc.page_content[:100]}...)"
+        # The one query embedding serves the semantic cache, the retrieval cache and the search itself
+        question_embedding = await embed_query(question)
+
+        # Differently worded versions of a cached question are served from the cache too
+        if (answer := response_cache.get(question, question_embedding)) is not None:
+            print("Serving answer from semantic cache.")
+            yield answer
+            return
+
+        # Questions close to an earlier one reuse the chunks retrieved for it
+        docs = retrieval_cache.get(question, question_embedding)
+        if docs is None:
+            docs = await asyncio.to_thread(retrieve, question_embedding)
+            retrieval_cache.put(question, question_embedding, docs)
+        answer = ""
+        async for token in generate_answer(question, docs):
+            answer += token
+            yield answer
+        if not answer:
+            yield "Sorry, I could not find an answer."
+            return
         print(f"Generated answer: {answer}")
-        return answer
+        response_cache.put(question, question_embedding, answer)
+    except (asyncio.TimeoutError, openai.APITimeoutError) as e:
+        print(f"Timed out during chat processing: {e}")
+        yield "Sorry, the analysis took too long. Please try again or ask a more specific question."
     except Exception as e:
         print(f"Error during chat processing: {e}")
-        return f"An error occurred: {e}"
+        yield f"An error occurred: {e}"
 
-# Initialize the chatbot when the script starts
-initialization_successful = initialize_chatbot()
+def answer_question(question, question_embedding):
+    '''Returns the complete answer to a question, bypassing the caches; uses the blocking API.'''
+    response = openai_client.chat.completions.create(
+        messages=build_messages(question, retrieve(question_embedding)),
+        **COMPLETION_PARAMS
+    )
+    return response.choices[0].message.content
 
-# Sample questions for easy access
-sample_questions = [
-    "Can you give me an overview of what the bill accomplishes?",
-    "What are the main tax changes in this bill and how will they affect ordinary taxpayers?",
-    "How does this bill change healthcare policy and what does it mean for patients?",
-    "What education funding changes does this bill make and who benefits?",
-    "How does this bill address infrastructure and what projects does it fund?",
-    "What are the defense and national security provisions in this legislation?",
-    "How does this bill reform immigration law and what are the key changes?",
-    "What environmental and climate provisions are included in this bill?",
-    "How does this bill affect Social Security and Medicare?",
-    "What are the small business provisions and how do they help entrepreneurs?"
-]
+def prewarm_response_cache():
+    '''Caches an answer to every sample question, so typed rewordings of them are served instantly.'''
+    # Runs on its own thread, so it uses the blocking API rather than Gradio's event loop
+    try:
+        for question, embedding in zip(sample_questions, SAMPLE_Q_EMBEDDINGS):
+            # Precomputed answers only need to be indexed; the rest are generated now
+            answer = SAMPLE_ANSWERS.get(question) or answer_question(question, embedding)
+            if answer:
+                response_cache.put(question, embedding, answer)
+        print("Response cache pre-warmed with the sample questions.")
+    except Exception as e:
+        print(f"Error while pre-warming the response cache: {e}")
+
+def build_ui(initialization_successful):
+    '''Creates the Gradio interface; the inputs are disabled if initialization failed.'''
+    with open(CSS_PATH, "r", encoding="utf-8") as f:
+        custom_css = f.read()
 
-# Create Gradio Interface
-with gr.Blocks(theme=gr.themes.Soft(), css="""
-    .message.bot, .message.user {
-        font-family: 'Segoe UI', 'Roboto', 'Helvetica Neue', Arial, sans-serif !important;
-        line-height: 1.6 !important;
-        font-size: 14px !important;
-    }
-    .chatbot .message {
-        font-family: 'Segoe UI', 'Roboto', 'Helvetica Neue', Arial, sans-serif !important;
-    }
-    .small-accordion {
-        margin-top: 10px;
-        font-size: 0.85em;
-        width: 80% !important;
-        margin-left: auto;
-        margin-right: auto;
-    }
-    .small-accordion button {
-        font-size: 0.8em !important;
-        padding: 1px 6px !important;
-        opacity: 0.8;
-        width: 100%;
-        text-align: left;
-        font-weight: bold !important;
-    }
-    .small-accordion > div:nth-child(2) {
-        padding: 8px !important;
-    }
-    .about-accordion .label-wrap span {
-        font-weight: bold !important;
-    }
-    /* Narrower sample question buttons with text wrapping */
-    .question-button {
-        width: 80% !important;
-        margin-left: auto !important;
-        margin-right: auto !important;
-        white-space: normal !important;
-        height: auto !important;
-        min-height: 32px !important;
-        text-align: left !important;
-        font-size: 0.85em !important;
-        margin-bottom: 5px !important;
-    }
-    """) as demo:
-    gr.Markdown("# Ask The One Big Beautiful Bill Anything! ⚖️")
-    gr.Markdown("I'm here to help you understand this important legislation in clear, accessible terms.")
+    with gr.Blocks(theme=gr.themes.Soft(), css=custom_css) as demo:
+        gr.Markdown("# Ask The One Big Beautiful Bill Anything! ⚖️")
+        gr.Markdown("I'm here to help you understand this important legislation in clear, accessible terms.")
     
-    if not initialization_successful:
-        gr.Markdown("""
-        **⚠️ System Unavailable**
+        if not initialization_successful:
+            gr.Markdown("""
+            **⚠️ System Unavailable**
         
-        The analysis system could not be initialized. Please ensure:
-        - Your `OPENAI_API_KEY` is properly set as an environment variable
-        - The bill text vector database exists (run `process_doc.py` first to create it)
-        - Check the terminal for detailed error messages
+            The analysis system could not be initialized. Please ensure:
+            - Your `OPENAI_API_KEY` is properly set as an environment variable
+            - The bill text vector database exists (run `process_doc.py` first to create it)
+            - Check the terminal for detailed error messages
         
-        You may need to restart this application after resolving these issues.
-        """)
+            You may need to restart this application after resolving these issues.
+            """)
     
-    with gr.Row():
-        # Left column for chat interface
-        with gr.Column(scale=3):
-            chatbot = gr.Chatbot(height=600, show_label=False)
-            msg = gr.Textbox(
-                placeholder="Ask me about any provision in the bill - I'll explain it in plain English...",
-                label="Your Question",
-                container=False
-            )
+        with gr.Row():
+            # Left column for chat interface
+            with gr.Column(scale=3):
+                chatbot = gr.Chatbot(height=600, show_label=False, type="messages")
+                msg = gr.Textbox(
+                    placeholder="Ask me about any provision in the bill - I'll explain it in plain English...",
+                    label="Your Question",
+                    container=False,
+                    interactive=initialization_successful
+                )
             
-        # Right column for sample questions and info
-        with gr.Column(scale=1):
-            gr.Markdown("### 💡 Popular Questions")
+            # Right column for sample questions and info
+            with gr.Column(scale=1):
+                gr.Markdown("### 💡 Popular Questions")
             
-            # Create buttons for each sample question with full text and wrapping
-            question_buttons = []
-            for i, question in enumerate(sample_questions):
-                # Use full question text for the button label
-                btn = gr.Button(
-                    question, 
-                    size="sm", 
-                    variant="secondary", 
-                    elem_classes="question-button"
-                )
-                question_buttons.append((btn, question))
+                # Create buttons for each sample question with full text and wrapping
+                question_buttons = []
+                for i, question in enumerate(sample_questions):
+                    # Use full question text for the button label
+                    btn = gr.Button(
+                        question, 
+                        size="sm", 
+                        variant="secondary", 
+                        elem_classes="question-button",
+                        interactive=initialization_successful
+                    )
+                    question_buttons.append((btn, question))
             
-            # Add About this chatbot accordion after all the sample questions
-            with gr.Accordion("About this chatbot", open=False, elem_classes=["small-accordion", "about-accordion"]):
-                gr.Markdown("""
-                <div style="font-size: 0.85em; line-height: 1.4;">
-                <strong>What I can help you with:</strong>
-                <ul style="margin-top: 5px; margin-bottom: 5px; padding-left: 20px;">
-                <li>Explain complex legal provisions in layman's terms</li>
-                <li>Summarize key sections and their practical implications</li>
-                <li>Clarify how different parts of the bill work together</li>
-                <li>Answer specific questions about provisions that interest you</li>
-                </ul>
+                # Add About this chatbot accordion after all the sample questions
+                with gr.Accordion("About this chatbot", open=False, elem_classes=["small-accordion", "about-accordion"]):
+                    gr.Markdown("""
+                    <div style="font-size: 0.85em; line-height: 1.4;">
+                    <strong>What I can help you with:</strong>
+                    <ul style="margin-top: 5px; margin-bottom: 5px; padding-left: 20px;">
+                    <li>Explain complex legal provisions in layman's terms</li>
+                    <li>Summarize key sections and their practical implications</li>
+                    <li>Clarify how different parts of the bill work together</li>
+                    <li>Answer specific questions about provisions that interest you</li>
+                    </ul>
                 
-                <strong>My commitment:</strong> I prioritize accuracy and fairness. I'll only use information from the actual bill text and will clearly indicate when I cannot answer based on available context.
+                    <strong>My commitment:</strong> I prioritize accuracy and fairness. I'll only use information from the actual bill text and will clearly indicate when I cannot answer based on available context.
                 
-                <em>The chatbot uses advanced RAG (Retrieval-Augmented Generation) with a vector database of the complete bill text.</em>
-                </div>
-                """)
+                    <em>The chatbot uses advanced RAG (Retrieval-Augmented Generation) with a vector database of the complete bill text.</em>
+                    </div>
+                    """)
     
-    # Chat functionality
-    def get_next_animation_frame(counter):
-        """Get the next frame of the animation"""
-        base_text = "Analyzing your question"
-        max_dots = 4
-        
-        # Calculate dots based on counter position in the cycle
-        cycle_position = counter % 8  # Full cycle is 8 frames (0-4 dots and back)
-        
-        if cycle_position <= 4:
-            # Growing dots (0,1,2,3,4)
-            dots = "." * cycle_position
-        else:
-            # Shrinking dots (3,2,1)
-            dots = "." * (8 - cycle_position)
-            
-        return base_text + dots
-    
-    def respond(message, chat_history):
-        if not message.strip():
-            return chat_history, ""
-        
-        # Add the user's question to show it immediately
-        chat_history.append((message, "Analyzing your question"))
-        yield chat_history, ""
+        # Chat functionality
+        async def respond(message, chat_history):
+            '''Shows the question right away, then streams the answer into the last chat message.'''
+            if not message.strip():
+                return
         
-        # Start the actual LLM processing in a background thread
-        result_container = {"response": None, "done": False}
-        
-        def get_llm_response():
-            result_container["response"] = chat_with_bill(message, chat_history[:-1])
-            result_container["done"] = True
-        
-        # Start LLM processing in background
-        llm_thread = threading.Thread(target=get_llm_response)
-        llm_thread.daemon = True
-        llm_thread.start()
-        
-        # Animate while waiting for LLM response
-        animation_counter = 0
-        while not result_container["done"]:
-            animation_counter += 1
-            animated_text = get_next_animation_frame(animation_counter)
-            chat_history[-1] = (message, animated_text)
+            # Add the user's question to show it immediately
+            chat_history.append({"role": "user", "content": message})
+            reply = {"role": "assistant", "content": "Analyzing your question..."}
+            chat_history.append(reply)
             yield chat_history, ""
-            time.sleep(0.4)  # Animation speed
         
-        # Update with the final response
-        chat_history[-1] = (message, result_container["response"])
-        yield chat_history, ""
+            # Stream the answer into the reply as it is generated; only its content changes,
+            # so Gradio sends the browser a small diff instead of re-sending the history
+            async for partial_answer in chat_with_bill(message, chat_history[:-2]):
+                reply["content"] = partial_answer
+                yield chat_history, ""
     
-    def use_sample_question(question, chat_history):
-        # Make a direct copy of respond function to ensure consistent behavior
-        if not question.strip():
-            return chat_history, ""
-        
-        # Add the user's question to show it immediately
-        chat_history.append((question, "Analyzing your question"))
-        yield chat_history, ""
-        
-        # Start the actual LLM processing in a background thread
-        result_container = {"response": None, "done": False}
-        
-        def get_llm_response():
-            result_container["response"] = chat_with_bill(question, chat_history[:-1])
-            result_container["done"] = True
-        
-        # Start LLM processing in background
-        llm_thread = threading.Thread(target=get_llm_response)
-        llm_thread.daemon = True
-        llm_thread.start()
-        
-        # Animate while waiting for LLM response
-        animation_counter = 0
-        while not result_container["done"]:
-            animation_counter += 1
-            animated_text = get_next_animation_frame(animation_counter)
-            chat_history[-1] = (question, animated_text)
-            yield chat_history, ""
-            time.sleep(0.4)  # Animation speed
-        
-        # Update with the final response
-        chat_history[-1] = (question, result_container["response"])
-        yield chat_history, ""
-    
-    # Event handlers for user input
-    msg.submit(
-        fn=respond,
-        inputs=[msg, chatbot], 
-        outputs=[chatbot, msg]
-    )
-    
-    # Connect each sample question button to automatically submit the question
-    for btn, question in question_buttons:
-        btn.click(
-            fn=partial(use_sample_question, question),
-            inputs=[chatbot],
+        # Event handlers for user input
+        msg.submit(
+            fn=respond,
+            inputs=[msg, chatbot], 
             outputs=[chatbot, msg]
         )
+    
+        def show_sample_answer(chat_history, question):
+            '''Appends a sample question and its precomputed answer to the chat.'''
+            chat_history.append({"role": "user", "content": question})
+            chat_history.append({"role": "assistant", "content": SAMPLE_ANSWERS[question]})
+            return chat_history, ""
+
+        # A sample question button shows its precomputed answer if there is one;
+        # otherwise it fills in the question, then submits it like a typed one
+        for btn, question in question_buttons:
+            if question in SAMPLE_ANSWERS:
+                btn.click(
+                    fn=lambda chat_history, q=question: show_sample_answer(chat_history, q),
+                    inputs=[chatbot],
+                    outputs=[chatbot, msg],
+                    queue=False
+                )
+            else:
+                btn.click(fn=lambda q=question: q, outputs=[msg]).then(
+                    fn=respond,
+                    inputs=[msg, chatbot],
+                    outputs=[chatbot, msg]
+                )
             
-    # Add OpenAI attribution
-    with gr.Row():
-        with gr.Column():
-            gr.Markdown("""
-            <div style="text-align: center; margin-top: 15px; padding-top: 15px; border-top: 1px solid #e0e0e0; color: #666; font-size: 0.8em;">
-            AI-generated content powered by OpenAI
-            </div>
-            """)
+        # Add OpenAI attribution
+        with gr.Row():
+            with gr.Column():
+                gr.Markdown("""
+                <div style="text-align: center; margin-top: 15px; padding-top: 15px; border-top: 1px solid #e0e0e0; color: #666; font-size: 0.8em;">
+                AI-generated content powered by OpenAI
+                </div>
+                """)
 
-if __name__ == "__main__":
+    return demo
+
+def main():
+    '''Initializes the RAG chain, then builds and launches the Gradio interface.'''
     if not OPENAI_API_KEY:
         print("CRITICAL ERROR: OPENAI_API_KEY is not set. The application will not work.")
         print("Please set it as an environment variable:")
         print("  PowerShell: $Env:OPENAI_API_KEY='your_api_key_here'")
         print("  Bash/Zsh:   export OPENAI_API_KEY='your_api_key_here'")
 
+    initialization_successful = initialize_chatbot()
+    if initialization_successful:
+        # Pre-warm in the background so the UI can start right away
+        threading.Thread(target=prewarm_response_cache, daemon=True).start()
+
     print("Launching Bill Analysis Interface...")
     if initialization_successful:
         print("Analysis system initialized successfully. Gradio interface launching.")
@@ -360,4 +528,8 @@ if __name__ == "__main__":
         print("Analysis system failed to initialize. Gradio will launch with an error message.")
         print("Please check for OPENAI_API_KEY and ensure the Chroma DB exists.")
 
-    demo.launch()
+    demo = build_ui(initialization_successful)
+    demo.queue(default_concurrency_limit=CONCURRENCY_LIMIT, max_size=MAX_QUEUE_SIZE).launch()
+
+if __name__ == "__main__":
+    main()